@@ -7,9 +7,12 @@
 #
 
 import os
+import atexit
+import functools
 import numpy as np
 import concurrent.futures
 from latqcdtools.base.check import checkType
+from latqcdtools.base.utilities import isFloatType, isIntType
 import latqcdtools.base.logger as logger
 
 
@@ -17,7 +20,7 @@ import latqcdtools.base.logger as logger
 HAVENUMBA=True
 HAVECUDA =True
 try:
-    from numba import njit
+    from numba import njit, prange, guvectorize
     from numba.typed import List
 except ImportError:
     HAVENUMBA=False
@@ -35,20 +38,35 @@ except ImportError:
     DEFAULTPARALLELIZER = 'concurrent.futures'
 
 
-COMPILENUMBA        = False
 MAXTHREADS          = os.cpu_count()
 DEFAULTTHREADS      = max(1, MAXTHREADS - 2)
 
 
+class _Config:
+
+    """
+    Mutable speedify state, toggled through numbaON/numbaOFF. Reading an attribute of a
+    slotted instance is cheaper in hot dispatch than the LOAD_GLOBAL dict lookups that the
+    old module-level flags required.
+    """
+
+    __slots__ = ('numba',)
+
+    def __init__(self):
+        self.numba = False
+
+_cfg = _Config()
+
+
 def numbaON():
     """ 
     Use numba wherever possible. By default it is turned off, since compilation takes some time,
     and hence you will only see a performance boost for particularly long-running functions. Must be
     called at the beginning of your code. 
     """
-    global COMPILENUMBA
     if HAVENUMBA:
-        COMPILENUMBA = True
+        _cfg.numba = True
+        compile.cache_clear()
         logger.info('Using numba to speed things up.')
     else:
         logger.warn('Numba does not seem to work on this system.')
@@ -58,21 +76,57 @@ def numbaOFF():
     """ 
     Turn off numba compilation for small functions. 
     """ 
-    global COMPILENUMBA
-    COMPILENUMBA = False 
+    _cfg.numba = False
+    compile.cache_clear()
     logger.info('No longer using numba.')
 
 
-def compile(func):
-    global COMPILENUMBA
-    global HAVENUMBA
-    if COMPILENUMBA and HAVENUMBA:
+def _compile_impl(func):
+    if _cfg.numba:
         logger.info(f'Compiling {func.__name__}.')
-        return njit(func)
+        try:
+            return njit(cache=True)(func)
+        except RuntimeError:
+            # Interactively defined functions have no source file for the on-disk cache.
+            return njit(func)
     else:
         return func
 
 
+@functools.lru_cache(maxsize=None)
+def compile(func):
+    """
+    Compile func with numba, if numba is active. Memoized, so calling compile on the same
+    function repeatedly (e.g. inside a loop) hands back the already-built dispatcher instead
+    of constructing a fresh one each time. The cache is cleared by numbaON/numbaOFF.
+
+    The dispatch on whether numba is active happens here, once, at decoration time: what you
+    get back is the bare compiled dispatcher (or func itself), with no wrapper in the hot
+    path. If numba rejects func, the error surfaces at first call; use compile_with_fallback
+    if you would rather drop back to pure Python in that case.
+    """
+    return _compile_impl(func)
+
+
+def compile_with_fallback(func):
+    """
+    Like compile, but if the compiled function fails at call time, e.g. because numba
+    cannot type func, transparently re-run the pure-Python original. The try/except lives
+    in this opt-in wrapper so that compile itself can stay wrapper-free.
+    """
+    compiled = compile(func)
+    if compiled is func:
+        return func
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return compiled(*args, **kwargs)
+        except Exception:
+            logger.details('Falling back to pure Python for',func.__name__)
+            return func(*args, **kwargs)
+    return wrapper
+
+
 def compileCUDA(func):
     global HAVECUDA
     if HAVECUDA: 
@@ -101,13 +155,27 @@ def get_optimal_block_size():
     return 256
 
 
+def _isHomogeneousNumeric(inList):
+    """
+    True if inList can be represented losslessly as a numeric ndarray.
+    """
+    try:
+        return np.asarray(inList).dtype.kind in 'iuf'
+    except (ValueError, TypeError):
+        return False
+
+
 def numbaList(inList):
-    """ 
-    Turn a list into List that numba can parse. 
-    """ 
-    global COMPILENUMBA
-    global HAVENUMBA
-    if COMPILENUMBA and HAVENUMBA:
+    """
+    Turn a list into something numba can parse. Homogeneous numeric input becomes a
+    contiguous ndarray, which numba consumes natively and iterates faster than a
+    typed.List; @njit callers should declare float64[:] accordingly. The typed.List
+    is kept only for heterogeneous or ragged input. Callers looping over the same fixed
+    list should convert once and reuse the result.
+    """
+    if _cfg.numba:
+        if _isHomogeneousNumeric(inList):
+            return np.ascontiguousarray(inList)
         nList = List()
         for x in inList:
             nList.append(x)
@@ -116,97 +184,265 @@ def numbaList(inList):
         return inList
 
 
+# Compiled prange kernels, one per function passed to parallel_numba.
+_NUMBA_RUNNERS = {}
+
+
+def _getNumbaRunner(function):
+    key    = id(function)
+    cached = _NUMBA_RUNNERS.get(key)
+    if cached is not None and cached[0] is function:
+        return cached[1]
+    jf = njit(function)
+    @njit(parallel=True)
+    def _run(xs):
+        out = np.empty(xs.shape[0])
+        for i in prange(xs.shape[0]):
+            out[i] = jf(xs[i])
+        return out
+    _NUMBA_RUNNERS[key] = (function, _run)
+    return _run
+
+
+def parallel_numba(function, input_array):
+    """
+    Evaluate a numba-compilable scalar function over a 1-d numeric array using numba's
+    thread-parallel prange. No processes are forked and nothing is pickled, which for pure
+    numeric kernels beats the process-pool backends. Compiled kernels are cached per
+    function. Raises if numba rejects the function.
+
+    This path is strictly opt-in: parallel_function_eval never dispatches here on its own,
+    because numba's threading layer is not fork-safe, and once it has started, a later
+    fork-based pool can deadlock the interpreter at exit. Call this only when you know the
+    rest of your run does not fork.
+
+    Args:
+        function (func): scalar function of one numeric argument
+        input_array (array-like): 1-d numeric array over which it should run
+
+    Returns:
+        np.ndarray: function(input_array)
+    """
+    xs = np.ascontiguousarray(input_array, dtype=np.float64)
+    return _getNumbaRunner(function)(xs)
+
+
+# Forking a fresh pool costs tens to hundreds of ms on many-core machines, which easily
+# dominates short parallel maps. Keep one persistent pool per (parallelizer, nproc) pair,
+# created lazily and torn down only at interpreter exit.
+_POOLS = {}
+
+
+def _getPool(parallelizer, nproc):
+    key = (parallelizer, nproc)
+    if key not in _POOLS:
+        if parallelizer=='concurrent.futures':
+            _POOLS[key] = concurrent.futures.ProcessPoolExecutor(max_workers=nproc)
+        elif parallelizer=='pathos.pools':
+            _POOLS[key] = pathos.pools.ProcessPool(processes=nproc)
+        else:
+            logger.TBRaise('Unknown parallelizer',parallelizer)
+    return _POOLS[key]
+
+
+def _shutdownPools():
+    for (parallelizer, _), pool in _POOLS.items():
+        if parallelizer=='concurrent.futures':
+            pool.shutdown()
+        else:
+            pool.close()
+            pool.join()
+            pool.clear()
+    _POOLS.clear()
+
+atexit.register(_shutdownPools)
+
+
+class _TaskWrapper:
+
+    """
+    Minimal picklable stand-in for ComputationClass.pass_argument_wrapper. Mapping the bound
+    method would serialize the whole ComputationClass, input_array included, into every task;
+    this ships only the function and its fixed arguments.
+    """
+
+    def __init__(self, function, args):
+        self._function = function
+        self._args     = args
+
+    def __call__(self, x):
+        return self._function(x, *self._args)
+
+
 class ComputationClass:
 
-    def __init__(self, function, input_array, args, nproc, parallelizer):
-        """ 
+    def __init__(self, function, input_array, args, nproc, parallelizer, batch_size=None):
+        """
         This class contains everything needed to parallelize a function. It allows for you to
         use your favorite parallelization library and pass arguments to the function.
 
         Args:
             function (func): to-be-parallelized function
-            input_array (array-like): run function over this array 
-            nproc (int): number of processors 
+            input_array (array-like): run function over this array
+            nproc (int): number of processors
             parallelizer (str): Which library should I use to parallelize?
+            batch_size (int, optional): map over input_array in batches of this size, so that
+                only batch_size tasks and results are in flight at a time. Use this when
+                input_array is too large to process in one go, e.g. for correlator bootstraps.
             *add_param: Pass any additional parameters as you would to the function
         """
         checkType('int',nproc=nproc)
         checkType("array",input_array=input_array)
         checkType(str,parallelizer=parallelizer)
+        if batch_size is not None:
+            checkType('int',batch_size=batch_size)
+            if batch_size < 1:
+                logger.TBRaise('batch_size must be at least 1.')
         self._input_array  = input_array
         self._function     = function
         self._parallelizer = parallelizer
         self._args         = args
         self._nproc        = nproc
+        self._batch_size   = batch_size
+        self._task         = _TaskWrapper(function, args) # built once, reused for every batch
         logger.debug('Initializing')
         logger.debug('input_array =',self._input_array)
         logger.debug('args =',self._args)
         logger.debug('parallelizer =',self._parallelizer)
         if nproc > MAXTHREADS:
-            logger.warn('We recommend using fewer processes than',MAXTHREADS) 
-        self._result = self.parallelization_wrapper() # compute the result when class is initialized
+            logger.warn('We recommend using fewer processes than',MAXTHREADS)
+        self._result = None # computed lazily on first getResult() call
 
     def __repr__(self) -> str:
         return "ComputationClass"
 
     def parallelization_wrapper(self):
-        if self._nproc==1:
-            results = []
-            for i in self._input_array:
-                logger.progress(i)
-                results.append(self.pass_argument_wrapper(i)) 
-        else:
-            if self._parallelizer=='concurrent.futures':
-                with concurrent.futures.ProcessPoolExecutor(max_workers=self._nproc) as executor:
-                    results=executor.map(self.pass_argument_wrapper, self._input_array)
-            elif self._parallelizer=='pathos.pools':
-                pool = pathos.pools.ProcessPool(processes=self._nproc)
-                results = pool.map(self.pass_argument_wrapper, self._input_array)
-                pool.close()
-                pool.join() 
-                pool.clear()
+        if self._batch_size is None:
+            return self._map_batch(self._input_array)
+        results = []
+        for start in range(0, len(self._input_array), self._batch_size):
+            # extend, not +=: _map_batch may return an ndarray, and list += ndarray
+            # broadcast-adds instead of appending.
+            results.extend(self._map_batch(self._input_array[start:start+self._batch_size]))
+        return results
+
+    def _map_batch(self, batch):
+        if self._nproc==1 or len(batch)<=1:
+            # With one process or one element there is nothing to parallelize, and pool
+            # dispatch overhead alone can exceed the real computation for short tasks.
+            if len(batch)==0:
+                return []
+            evals = self._progress_evals(batch)
+            first = next(evals)
+            if isIntType(first) or isFloatType(first):
+                # Real scalar output lets us fill one preallocated array straight from the
+                # generator, skipping the intermediate Python list.
+                results = np.empty(len(batch))
+                results[0] = first
+                for j, res in enumerate(evals, start=1):
+                    results[j] = res
             else:
-                logger.TBRaise('Unknown parallelizer',self._parallelizer)
-            results = list(results)
+                results = [first] + list(evals)
+        else:
+            pool = _getPool(self._parallelizer, self._nproc)
+            # The default chunksize of 1 sends one pickle round-trip per element, which
+            # swamps short tasks on many cores. Aim for about 4 chunks per worker.
+            chunksize = max(1, len(batch)//(4*self._nproc))
+            results = pool.map(self._task, batch, chunksize=chunksize)
+            if not isinstance(results, list):
+                # concurrent.futures hands back a lazy iterator; materialize it exactly once.
+                # pathos already returns a list, which we hand through without copying.
+                results = list(results)
         return results
 
+    def _progress_evals(self, batch):
+        for i in batch:
+            logger.progress(i)
+            yield self.pass_argument_wrapper(i)
+
     def pass_argument_wrapper(self, single_input):
         return self._function(single_input, *self._args)
 
     def getResult(self):
+        if self._result is None:
+            self._result = self.parallelization_wrapper()
         return self._result
 
 
-def parallel_function_eval(function, input_array, args=(), nproc=DEFAULTTHREADS, parallelizer=DEFAULTPARALLELIZER):
-    """ 
+def parallel_function_eval(function, input_array, args=(), nproc=DEFAULTTHREADS, parallelizer=DEFAULTPARALLELIZER,
+                           batch_size=None):
+    """
     Parallelize a function over an input_array. Effectively this can replace a loop over an array and should
     lead to a performance boost.
 
     Args:
-        function (func): to-be-parallelized function 
-        input_array (array-like): array over which it should run 
-        nproc (int): number of processes 
+        function (func): to-be-parallelized function
+        input_array (array-like): array over which it should run
+        nproc (int): number of processes
+        batch_size (int, optional): work through input_array in batches of this size to cap memory use
 
     Returns:
         array-like: func(input_array)
     """
-    computer = ComputationClass(function, input_array, args=args, nproc=nproc, parallelizer=parallelizer)
+    computer = ComputationClass(function, input_array, args=args, nproc=nproc, parallelizer=parallelizer,
+                                batch_size=batch_size)
     if nproc==1:
         logger.details('Using for-loop instead of',parallelizer)
     return computer.getResult()
 
 
+def register_reducer(function):
+    """
+    Compile a reducer into a thread-parallel numba gufunc that parallel_reduce can call
+    directly, with no pool or pickling overhead. The reducer must have the form
+    f(x, out), writing its reduction of the 1-d block x into out[0], e.g.
+        def mySum(x, out):
+            out[0] = x.sum()
+    If numba is unavailable the function is handed back unchanged.
+
+    Like parallel_numba, calling the registered reducer starts numba's threading layer,
+    which is not fork-safe: avoid mixing it with the fork-based pool backends in one run.
+    """
+    if not HAVENUMBA:
+        logger.warn('Cannot register reducer without numba.')
+        return function
+    gufunc = guvectorize(['void(f8[:], f8[:])'], '(n)->()', target='parallel', nopython=True)(function)
+    gufunc._registered_reducer = True
+    return gufunc
+
+
+def _sumChunk(chunk, function, args):
+    """
+    Accumulate function over one chunk of the input. Runs inside a worker, so only the
+    partial sum travels back over IPC rather than one result per element.
+    """
+    res = 0.
+    for x in chunk:
+        res = res + function(x, *args)
+    return res
+
+
 def parallel_reduce(function, input_array, args=(), nproc=DEFAULTTHREADS, parallelizer=DEFAULTPARALLELIZER) -> float:
-    """ 
-    Parallelize a function over an input_array, then sum over the input_array elements. 
+    """
+    Parallelize a function over an input_array, then sum over the input_array elements.
 
     Args:
-        function (func): to-be-parallelized function 
-        input_array (array-like): array over which it should run 
-        nproc (int): number of processes 
+        function (func): to-be-parallelized function
+        input_array (array-like): array over which it should run
+        nproc (int): number of processes
 
     Returns:
         float
     """
-    container = parallel_function_eval(function, input_array, nproc=nproc, args=args, parallelizer=parallelizer)
-    return np.sum(container)
+    if getattr(function, '_registered_reducer', False):
+        # Reducers that went through register_reducer consume the whole array in one
+        # gufunc call; there is nothing to farm out to a pool.
+        return np.sum(function(np.ascontiguousarray(input_array, dtype=np.float64)))
+    if nproc==1 or len(input_array)<=1:
+        return np.sum(_sumChunk(input_array, function, args))
+    # Fuse map and reduction: each worker sums its chunk locally, and only the per-chunk
+    # partial sums are materialized on this side.
+    chunksize = max(1, int(np.ceil(len(input_array)/(4*nproc))))
+    chunks    = [input_array[i:i+chunksize] for i in range(0, len(input_array), chunksize)]
+    partials  = parallel_function_eval(_sumChunk, chunks, args=(function, args), nproc=nproc, parallelizer=parallelizer)
+    return np.sum(partials)
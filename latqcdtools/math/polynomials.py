@@ -4,8 +4,113 @@
 # J. Goswami
 # 
 
+import numpy as np
 from latqcdtools.base.check import checkType
 
+# Polynomial evaluation sits inside fit and integration loops, where it is called once per
+# scalar x. Compile the Horner kernels with numba when it is available so those calls run
+# as tight native loops rather than per-term Python bytecode.
+try:
+    from numba import njit
+except ImportError:
+    def njit(**kwargs):
+        def passthrough(func):
+            return func
+        return passthrough
+
+
+@njit(cache=True, fastmath=True)
+def _horner(c, x):
+    """
+    Evaluate a polynomial with coefficients c (ascending powers) at scalar x by Horner's rule.
+    """
+    res = 0.0
+    for i in range(c.size - 1, -1, -1):
+        res = res*x + c[i]
+    return res
+
+
+@njit(cache=True, fastmath=True)
+def _horner_ratio(n, d, x):
+    """
+    Evaluate the ratio of two polynomials at scalar x, running both Horner chains in one pass.
+    """
+    res_num = 0.0
+    res_den = 0.0
+    for i in range(max(n.size, d.size) - 1, -1, -1):
+        if i < n.size:
+            res_num = res_num*x + n[i]
+        if i < d.size:
+            res_den = res_den*x + d[i]
+    return res_num/res_den
+
+
+# Polynomials of at most this degree get a generated closed-form evaluator.
+_CODEGENDEGREE = 6
+
+
+def _codegen_horner(coeffs):
+    """
+    Partially evaluate Horner's rule for a fixed set of coefficients: build the nested
+    expression c[0] + x*(c[1] + x*(...)) as source and compile it once. The resulting
+    lambda is loop- and branch-free and broadcasts over ndarray x. Worthwhile for the
+    low degrees (2-6) that dominate in practice.
+    """
+    if len(coeffs) == 1:
+        # Keep the constant case x-dependent so it still broadcasts over ndarray input.
+        return eval("lambda x, c=coeffs: c[0] + 0*x", {"coeffs": coeffs})
+    expr = f"c[{len(coeffs)-1}]"
+    for i in range(len(coeffs)-2, -1, -1):
+        if coeffs[i] == 0.:
+            # Fold zero terms, e.g. even-only expansions like [A0, 0., A2, 0., A4],
+            # out of the generated expression entirely.
+            expr = f"x*({expr})"
+        else:
+            expr = f"c[{i}] + x*({expr})"
+    return eval(f"lambda x, c=coeffs: {expr}", {"coeffs": coeffs})
+
+
+def _horner_generic(c, x):
+    """
+    Horner's rule with no dtype assumptions, for input (e.g. complex x) that the float64
+    kernels cannot take. Works for scalars and ndarrays alike.
+    """
+    res = 0*x
+    for ci in c[::-1]:
+        res = res*x + ci
+    return res
+
+
+def _sparse_terms(coeffs):
+    """
+    The (power, coefficient) pairs of the nonzero terms.
+    """
+    return [(i, float(c)) for i, c in enumerate(coeffs) if c != 0.]
+
+
+def _sparse_eval(terms, x):
+    """
+    Evaluate a polynomial from its nonzero (power, coefficient) pairs. For the even-only
+    expansions the docstrings advertise, this halves the multiplications.
+    """
+    res = 0*x
+    for i, c in terms:
+        res = res + c*x**i
+    return res
+
+
+def _horner_array(c, x):
+    """
+    Horner's rule over an ndarray of points, accumulating in place. This touches only one
+    output buffer instead of allocating a size-len(x) temporary for every power of x.
+    """
+    out = np.full(np.shape(x), c[-1])
+    for ci in c[-2::-1]:
+        out *= x
+        out += ci
+    return out
+
+
 class Polynomial:
 
     """
@@ -17,17 +122,33 @@ class Polynomial:
 
     def __init__(self, coeffs=None):
         checkType("array",coeffs=coeffs)
-        self.coeffs = coeffs
+        self.coeffs = np.ascontiguousarray(coeffs, dtype=np.float64)
+        if len(self.coeffs) <= _CODEGENDEGREE + 1:
+            self._fn = _codegen_horner(self.coeffs)
+        else:
+            self._fn = None
+        self._sparse = _sparse_terms(self.coeffs)
+        # Dense polynomials are better served by Horner; iterate the sparse terms only
+        # when at least half the coefficients vanish.
+        self._useSparse = self._fn is None and 2*len(self._sparse) <= len(self.coeffs)
 
     @property
     def __repr__(self) -> str:
         return "Polynomial{0}".format((str(self.coeffs)))
 
     def __call__(self, x):
-        res = 0.0
-        for index_num in range(len(self.coeffs)):
-            res += self.coeffs[index_num] *x**index_num
-        return res
+        # Horner's rule costs O(n) multiplications rather than the O(n^2) of evaluating
+        # each x**n from scratch. Low degrees use the generated closed form; otherwise
+        # scalars go through the compiled kernel and ndarrays accumulate in place.
+        if self._fn is not None:
+            return self._fn(x)
+        if self._useSparse:
+            return _sparse_eval(self._sparse, x)
+        if np.iscomplexobj(x):
+            return _horner_generic(self.coeffs, x)
+        if np.ndim(x) == 0:
+            return _horner(self.coeffs, float(x))
+        return _horner_array(self.coeffs, x)
 
 
 class Rational:
@@ -39,18 +160,22 @@ class Rational:
     def __init__(self, num_coeffs, den_coeffs):
         checkType("array",num_coeffs=num_coeffs)
         checkType("array",den_coeffs=den_coeffs)
-        self.num_coeffs = num_coeffs
-        self.den_coeffs = den_coeffs
+        self.num_coeffs = np.ascontiguousarray(num_coeffs, dtype=np.float64)
+        self.den_coeffs = np.ascontiguousarray(den_coeffs, dtype=np.float64)
+        self._sparse_num = _sparse_terms(self.num_coeffs)
+        self._sparse_den = _sparse_terms(self.den_coeffs)
+        self._useSparse  = 2*( len(self._sparse_num) + len(self._sparse_den) ) \
+                           <= len(self.num_coeffs) + len(self.den_coeffs)
 
     @property
     def __repr__(self) -> str:
         return "Rational function" + (str(self.num_coeffs) + str(self.den_coeffs))
 
     def __call__(self, x):
-        res = 0.0
-        res_den = 0.0
-        for index_den in range(len(self.den_coeffs)):
-            res_den += self.den_coeffs[index_den] *x**index_den
-        for index_num in range(len(self.num_coeffs)):
-            res += self.num_coeffs[index_num] *x**index_num/res_den
-        return res
+        if self._useSparse:
+            return _sparse_eval(self._sparse_num, x)/_sparse_eval(self._sparse_den, x)
+        if np.iscomplexobj(x):
+            return _horner_generic(self.num_coeffs, x)/_horner_generic(self.den_coeffs, x)
+        if np.ndim(x) == 0:
+            return _horner_ratio(self.num_coeffs, self.den_coeffs, float(x))
+        return _horner_array(self.num_coeffs, x)/_horner_array(self.den_coeffs, x)
@@ -1,15 +1,19 @@
-# 
-# testUtilities.py                                                               
-# 
+#
+# testUtilities.py
+#
 # D. Clarke
-# 
+#
 # Test some of the methods in the utilities module.
-# 
+#
 
+import os
+import subprocess
+import sys
 import numpy as np
+import latqcdtools
 from latqcdtools.testing import print_results, concludeTest
-from latqcdtools.base.speedify import parallel_function_eval, parallel_reduce, compile, numbaON, \
-    DEFAULTTHREADS
+from latqcdtools.base.speedify import parallel_function_eval, parallel_reduce, compile, \
+    compile_with_fallback, numbaON, DEFAULTTHREADS
 
 numbaON()
 
@@ -20,6 +24,10 @@ def square(x):
 def power(x,i):
     return x**i
 
+@compile_with_fallback
+def notCompilable(x):
+    return {'x': x} # numba cannot type a dict return
+
 
 def testSpeedify():
 
@@ -48,8 +56,36 @@ def testSpeedify():
 
     lpass *= print_results(sum1,sum2,text='parallel power')
 
+    refSquares = [power(i,2) for i in testArray]
+    for nproc in [1, DEFAULTTHREADS]:
+        temp = parallel_function_eval(power,testArray,args=(2,),nproc=nproc,batch_size=3)
+        lpass *= print_results(temp,refSquares,text=f'batch_size=3, nproc={nproc}')
+
+    lpass *= (notCompilable(3)['x'] == 3)
+
     concludeTest(lpass)
 
 
+def testParallelNumba():
+    # numba's threading layer is not fork-safe, so exercise parallel_numba and
+    # register_reducer in their own interpreter, away from the pool-based tests above.
+    script = ( "import numpy as np\n"
+               "from latqcdtools.base.speedify import parallel_numba, parallel_reduce, register_reducer\n"
+               "def cube(x):\n"
+               "    return x**3\n"
+               "res = parallel_numba(cube, np.arange(10.))\n"
+               "assert np.allclose(res, np.arange(10.)**3)\n"
+               "@register_reducer\n"
+               "def squareReduce(x, out):\n"
+               "    out[0] = (x*x).sum()\n"
+               "assert np.isclose(parallel_reduce(squareReduce, np.arange(10.)), 285.)\n" )
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(latqcdtools.__file__)) \
+                        + os.pathsep + env.get('PYTHONPATH','')
+    proc = subprocess.run([sys.executable,'-c',script],env=env)
+    concludeTest(proc.returncode == 0)
+
+
 if __name__ == '__main__':
-    testSpeedify()
\ No newline at end of file
+    testSpeedify()
+    testParallelNumba()
@@ -1,15 +1,20 @@
-# 
+#
 # testPolynomial.py
-# 
+#
 # D. Clarke
-# 
+#
 # Testing for the Polynomial and Rational classes.
-# 
+#
 
+import numpy as np
 from latqcdtools.testing import print_results, concludeTest
 from latqcdtools.math.polynomials import Polynomial, Rational
 
 
+def _reference(coeffs, x):
+    return sum(c*x**i for i, c in enumerate(coeffs))
+
+
 def testPolynomial():
 
     lpass = True
@@ -21,8 +26,30 @@ def testPolynomial():
     r = Rational([1,1,1,1],[1,1,1,1])
     lpass *= print_results(r(2),1,text="Rational test",prec=1e-10)
 
+    x = np.linspace(-2,2,9)
+
+    # Exercise each evaluation path: generated closed form (low degree), sparse
+    # (mostly zero coefficients), and dense Horner (high degree), for scalar and
+    # ndarray input alike.
+    for coeffs in [ [5.], [1,0,2,0,4], [1,0,2,0,0,0,0,0,4], list(range(1,12)) ]:
+        p = Polynomial(coeffs)
+        lpass *= print_results(p(1.7),_reference(coeffs,1.7),text=f"Polynomial scalar, {len(coeffs)} coeffs")
+        lpass *= print_results(p(x),_reference(coeffs,x),text=f"Polynomial array, {len(coeffs)} coeffs")
+
+    num, den = [0,1,0,3], [1,0,2,0,0,0,0,0,1]
+    r = Rational(num,den)
+    lpass *= print_results(r(0.9),_reference(num,0.9)/_reference(den,0.9),text="sparse Rational scalar")
+    lpass *= print_results(r(x),_reference(num,x)/_reference(den,x),text="sparse Rational array")
+
+    # Complex arguments must work on every path.
+    z = 1+2j
+    pz = Polynomial(list(range(1,12)))
+    lpass *= print_results(pz(z),_reference(list(range(1,12)),z),text="complex Polynomial")
+    rz = Rational([1.,2.,3.],[1.,1.])
+    lpass *= print_results(rz(z),_reference([1.,2.,3.],z)/_reference([1.,1.],z),text="complex Rational")
+
     concludeTest(lpass)
 
 
 if __name__ == '__main__':
-    testPolynomial()
\ No newline at end of file
+    testPolynomial()